@@ -6,17 +6,23 @@ Proxy Harvester - Scrape free proxies from multiple public sources with robust C
 
 import argparse
 import logging
+import re
+import socket
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Set
 from importlib.metadata import version
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
 from colorama import Fore, Style, init
 
-# Initialize colorama
-init(autoreset=True)
+# Initialize colorama; strip color codes outright when stdout is not a TTY
+init(autoreset=True, strip=not sys.stdout.isatty())
 
 ver = version("proxy-harvester")
 BANNER = f"""
@@ -32,87 +38,131 @@ Proxy Harvester v{ver}
 by github.com/TheSilentPatch
 {Style.RESET_ALL}"""
 
+# Colored message templates composed once at import so per-call prints don't
+# redo the Fore/Style attribute lookups
+_OK_TMPL = f"{Fore.GREEN}[OK] {{msg}}{Style.RESET_ALL}"
+_ERROR_TMPL = f"{Fore.RED}[ERROR] {{msg}}{Style.RESET_ALL}"
+_SUMMARY_TMPL = (
+    f"\n{Fore.GREEN}[OK] Harvest complete!{Style.RESET_ALL}\n"
+    f"{Fore.YELLOW}• Scraped proxies:{Fore.CYAN} {{total}}\n"
+    f"{Fore.YELLOW}• Valid proxies:{Fore.CYAN} {{valid}}\n"
+    f"{Fore.YELLOW}• Type:{Fore.CYAN} {{ptype}}\n"
+    f"{Fore.YELLOW}• Output:{Fore.CYAN} {{output}}{Style.RESET_ALL}"
+)
+
+# Advertise brotli only when a decoder is importable, otherwise requests
+# could not decompress the response
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0"
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Accept-Encoding": _ACCEPT_ENCODING,
 }
 
+# Shared session so keep-alive connections are reused across fetches instead
+# of paying the TCP+TLS handshake for every request
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_ADAPTER = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+# Matches one ip:port per line in raw text lists; scanning bytes with a
+# compiled regex keeps the whole sweep in C instead of splitting per line.
+# Octet (0-255) and port (1-65535) ranges are encoded in the pattern, so
+# invalid rows are rejected during the scan instead of surviving until the
+# per-row validate_proxy call downstream.
+_OCTET = rb"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_PORT = rb"(?:6553[0-5]|655[0-2]\d|65[0-4]\d{2}|6[0-4]\d{3}|[1-5]\d{4}|[1-9]\d{0,3})"
+RAW_PROXY_RE = re.compile(
+    rb"(?m)^(" + _OCTET + rb"(?:\." + _OCTET + rb"){3}):(" + _PORT + rb")\r?$"
+)
+
+# One parser instance shared by every parse call; skipping the xml:id index
+# and blank text nodes trims parse CPU and memory on large pages. Parsing
+# happens on the main thread only, so sharing it is safe.
+_HTML_PARSER = lxml.html.HTMLParser(
+    collect_ids=False, remove_blank_text=True, huge_tree=False
+)
+
 # Specific parsers for different sites
-def parse_free_proxy_list(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_free_proxy_list(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Parser for free-proxy-list.net format"""
-    return parse_generic_proxy_table(html, logger)
+    return parse_generic_proxy_table(content, logger)
 
-def parse_sslproxies(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_sslproxies(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Parser for sslproxies.org format"""
-    return parse_generic_proxy_table(html, logger)
+    return parse_generic_proxy_table(content, logger)
 
-def parse_us_proxy(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_us_proxy(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Parser for us-proxy.org format"""
-    return parse_generic_proxy_table(html, logger)
+    return parse_generic_proxy_table(content, logger)
 
-def parse_proxy_list_download(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_proxy_list_download(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Parser for proxy-list.download format"""
     proxies = []
     try:
-        soup = BeautifulSoup(html, "lxml")
-        table = soup.find("table", {"id": "tblproxy"})
-        if not table:
-            return []
-            
-        headers = [th.text.strip().lower() for th in table.find("thead").find_all("th")]
-        for row in table.find("tbody").find_all("tr"):
-            cols = [td.text.strip() for td in row.find_all("td")]
-            if len(cols) == len(headers):
-                proxy_data = dict(zip(headers, cols))
-                proxies.append(proxy_data)
+        tree = lxml.html.fromstring(content, parser=_HTML_PARSER)
+        headers = []
+        for row in tree.xpath("//table[@id='tblproxy']//tr"):
+            ths = row.xpath("./th")
+            if ths:
+                headers = [th.text_content().strip().lower() for th in ths]
+                continue
+            cols = [td.text_content().strip() for td in row.xpath("./td")]
+            if headers and len(cols) == len(headers):
+                proxies.append(dict(zip(headers, cols)))
     except Exception as e:
         logger.warning(f"Failed to parse proxy-list.download format: {e}")
     return proxies
 
-def parse_raw_proxy_list(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_raw_proxy_list(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Parser for raw text proxy lists"""
-    proxies = []
-    for line in html.splitlines():
-        line = line.strip()
-        if line and ":" in line:
-            ip, port = line.split(":", 1)
-            proxies.append({"ip": ip, "port": port})
-    return proxies
+    return [
+        {"ip": m.group(1).decode(), "port": m.group(2).decode()}
+        for m in RAW_PROXY_RE.finditer(content)
+    ]
 
-def parse_generic_proxy_table(html: str, logger: logging.Logger) -> List[Dict[str, str]]:
+def parse_generic_proxy_table(content: bytes, logger: logging.Logger) -> List[Dict[str, str]]:
     """Generic parser for HTML tables"""
     proxies = []
     try:
-        soup = BeautifulSoup(html, "lxml")
-        table = soup.find("table")
-        if not table:
-            return []
-            
+        tree = lxml.html.fromstring(content, parser=_HTML_PARSER)
         headers = []
-        thead = table.find("thead")
-        if thead:
-            headers = [th.text.strip().lower() for th in thead.find_all("th")]
-        
-        # If no headers in thead, try to find them in the first row
-        if not headers:
-            first_row = table.find("tr")
-            if first_row:
-                headers = [td.text.strip().lower() for td in first_row.find_all("td")]
-                rows = table.find_all("tr")[1:]  # Skip header row
-            else:
-                rows = table.find_all("tr")
-        else:
-            rows = table.find_all("tr")[1:] if thead else table.find_all("tr")
-        
-        for row in rows:
-            cols = [td.text.strip() for td in row.find_all("td")]
+        data_rows = []
+        for row in tree.xpath("//table//tr"):
+            if row.xpath("./th"):
+                # Header row; keep the first, skip repeats (e.g. tfoot)
+                if not headers:
+                    headers = [
+                        c.text_content().strip().lower()
+                        for c in row.xpath("./th|./td")
+                    ]
+                continue
+            cells = [td.text_content().strip() for td in row.xpath("./td")]
+            if cells:
+                data_rows.append(cells)
+
+        # No <th> header row: treat the first data row as headers
+        if not headers and data_rows:
+            headers = [c.lower() for c in data_rows.pop(0)]
+
+        for cols in data_rows:
             if len(cols) == len(headers):
-                proxy_data = dict(zip(headers, cols))
-                proxies.append(proxy_data)
-            elif cols:  # Handle rows with different column counts
-                # Try to extract IP and port from first two columns
-                if len(cols) >= 2:
-                    proxies.append({"ip": cols[0], "port": cols[1]})
-                
+                proxies.append(dict(zip(headers, cols)))
+            elif len(cols) >= 2:
+                # Handle rows with different column counts: take IP and port
+                # from the first two columns
+                proxies.append({"ip": cols[0], "port": cols[1]})
+
         logger.info(f"Parsed {len(proxies)} proxies from HTML")
     except Exception as e:
         logger.warning(f"Generic parsing failed: {e}")
@@ -127,11 +177,14 @@ PARSERS = {
     "raw.githubusercontent.com": parse_raw_proxy_list
 }
 
+@lru_cache(maxsize=None)
 def get_parser_for_url(url: str):
     """Get the appropriate parser for a given URL"""
     for domain, parser in PARSERS.items():
         if domain in url:
             return parser
+    if url.endswith(".txt"):
+        return parse_raw_proxy_list
     return parse_generic_proxy_table  # Fallback parser
 
 # List of proxy source URLs to scrape
@@ -160,83 +213,109 @@ def setup_logger(verbose: bool = False) -> logging.Logger:
 def validate_output_path(path: str, logger: logging.Logger) -> Path:
     try:
         path_obj = Path(path).expanduser().resolve()
-        # If directory, append default filename
-        if path_obj.is_dir() or path.endswith(os.sep):
+        # A trailing separator means a directory; append default filename
+        if path.endswith(os.sep) or path.endswith("/"):
             logger.info("Output is a directory; using default filename proxies.txt")
             path_obj = path_obj / "proxies.txt"
-        # Create parent directories if missing
-        if not path_obj.parent.exists():
-            logger.info(f"Creating directories: {path_obj.parent}")
-            path_obj.parent.mkdir(parents=True, exist_ok=True)
+        # mkdir/touch are idempotent, so no exists()/is_dir() stats up front
+        path_obj.parent.mkdir(parents=True, exist_ok=True)
         # Ensure file exists for later reading/updating
         path_obj.touch(exist_ok=True)
         return path_obj
     except (PermissionError, OSError) as e:
         logger.error(f"Filesystem error: {e}")
-        print(f"{Fore.RED}[ERROR] Output path error: {e}{Style.RESET_ALL}")
+        print(_ERROR_TMPL.format(msg=f"Output path error: {e}"))
         sys.exit(3)
 
-def fetch_html_content(url: str, logger: logging.Logger) -> Optional[str]:
+def fetch_html_content(url: str, logger: logging.Logger, stream: bool = False) -> Optional[bytes]:
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
+        response = SESSION.get(url, timeout=15, stream=stream)
         response.raise_for_status()
+        if stream:
+            # Consume decoded chunks as they arrive rather than blocking on
+            # one large read; used for the big raw text lists
+            content = b"".join(response.iter_content(chunk_size=1 << 16))
+        else:
+            content = response.content
         logger.info(f"Fetched content from {url}")
-        return response.text
+        return content
     except requests.RequestException as e:
         logger.warning(f"Failed to fetch {url}: {e}")
         return None
 
 def validate_proxy(proxy: Dict[str, str]) -> Optional[str]:
+    ip = proxy.get("ip address") or proxy.get("ip")
+    port = proxy.get("port")
+    # isdigit() alone is unsafe here: it accepts non-ASCII digits that int()
+    # rejects (superscripts) or that break the ASCII output invariant
+    if not ip or not port or not (port.isascii() and port.isdecimal()):
+        return None
+    if not 0 < int(port) <= 65535:
+        return None
+    # inet_aton parses all four octets in a single C call; guard the dot
+    # count first since it also accepts short forms like "127.1"
+    if ip.count(".") != 3:
+        return None
     try:
-        ip = proxy.get("ip address") or proxy.get("ip")
-        port = proxy.get("port")
-        if not ip or not port or not port.isdigit():
-            return None
-        # Basic IP validation
-        if not all(0 <= int(part) <= 255 for part in ip.split(".")):
-            return None
-        return f"{ip}:{port}"
-    except Exception:
+        socket.inet_aton(ip)
+    except OSError:
         return None
+    return f"{ip}:{port}"
+
+def filter_proxies(proxies: List[Dict[str, str]], proxy_type: str, logger: logging.Logger) -> Set[str]:
+    # One pass building the deduplicated set directly; "all" skips the
+    # https-flag check entirely
+    wanted = "yes" if proxy_type == "https" else "no"
+    return {
+        v for p in proxies
+        if (proxy_type == "all" or p.get("https") == wanted)
+        and (v := validate_proxy(p))
+    }
 
-def filter_proxies(proxies: List[Dict[str, str]], proxy_type: str, logger: logging.Logger) -> List[str]:
-    valid = []
-    for p in proxies:
-        https_flag = p.get("https")
-        if proxy_type == "https" and https_flag != "yes":
-            continue
-        if proxy_type == "http" and https_flag != "no":
-            continue
-        formatted = validate_proxy(p)
-        if formatted:
-            valid.append(formatted)
-    return valid
-
-def save_proxies(proxies: List[str], path: Path, logger: logging.Logger) -> None:
+def save_proxies(proxies: Iterable[str], path: Path, logger: logging.Logger, sort: bool = False) -> None:
     try:
+        # Read existing entries, remembering whether the file ends in a newline
         existing = set()
-        # Read existing entries
+        ends_with_newline = True
         with path.open("r", encoding="utf-8") as f:
-            existing = set(line.strip() for line in f if line.strip())
-        new_set = set(proxies)
-        combined = sorted(existing | new_set)
-        with path.open("w", encoding="utf-8") as f:
-            f.write("\n".join(combined))
-        added = len(new_set - existing)
-        logger.info(f"Updated {path}: +{added} new, total {len(combined)}")
-        print(f"{Fore.GREEN}[OK] Saved {added} new proxies to {path}{Style.RESET_ALL}")
+            for line in f:
+                ends_with_newline = line.endswith("\n")
+                line = line.strip()
+                if line:
+                    existing.add(line)
+        new_only = set(proxies) - existing
+        # Write line by line in binary with a 1 MiB buffer; validate_proxy
+        # guarantees plain ASCII ip:port entries, and skipping the joined
+        # string keeps peak memory at one copy of the data
+        if sort:
+            combined = sorted(existing | new_only)
+            with path.open("wb", buffering=1 << 20) as f:
+                f.writelines(p.encode("ascii") + b"\n" for p in combined)
+            total = len(combined)
+        else:
+            # Append only the new entries; rewriting and re-sorting the whole
+            # union every run costs O(N log N) on a file that only grows
+            with path.open("ab", buffering=1 << 20) as f:
+                if existing and not ends_with_newline:
+                    f.write(b"\n")
+                f.writelines(p.encode("ascii") + b"\n" for p in new_only)
+            total = len(existing) + len(new_only)
+        added = len(new_only)
+        logger.info(f"Updated {path}: +{added} new, total {total}")
+        print(_OK_TMPL.format(msg=f"Saved {added} new proxies to {path}"))
     except Exception as e:
         logger.error(f"File write error: {e}")
-        print(f"{Fore.RED}[ERROR] Failed to write output: {e}{Style.RESET_ALL}")
+        print(_ERROR_TMPL.format(msg=f"Failed to write output: {e}"))
         sys.exit(4)
 
 def print_summary(total: int, valid_count: int, proxy_type: str, output_path: Path, logger: logging.Logger) -> None:
     logger.info(f"Scraping complete — total scraped: {total}, valid: {valid_count}")
-    print(f"\n{Fore.GREEN}[OK] Harvest complete!{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}• Scraped proxies:{Fore.CYAN} {total}")
-    print(f"{Fore.YELLOW}• Valid proxies:{Fore.CYAN} {valid_count}")
-    print(f"{Fore.YELLOW}• Type:{Fore.CYAN} {proxy_type.upper()}")
-    print(f"{Fore.YELLOW}• Output:{Fore.CYAN} {output_path}{Style.RESET_ALL}")
+    print(_SUMMARY_TMPL.format(
+        total=total,
+        valid=valid_count,
+        ptype=proxy_type.upper(),
+        output=output_path,
+    ))
 
 def main() -> None:
     print(BANNER)
@@ -260,6 +339,11 @@ def main() -> None:
         action="store_true",
         help="Enable verbose logging"
     )
+    parser.add_argument(
+        "--sort",
+        action="store_true",
+        help="Rewrite the output file in sorted order instead of appending"
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -273,23 +357,37 @@ def main() -> None:
     output_path = validate_output_path(args.output, logger)
 
     all_raw = []
+    seen = set()
     total_scraped = 0
 
-    for url in SOURCES:
-        html = fetch_html_content(url, logger)
-        if html:
+    # Fetch all sources in parallel; the workload is network-bound so threads
+    # spend their time waiting on sockets, not competing for the GIL
+    try:
+        with ThreadPoolExecutor(max_workers=len(SOURCES)) as executor:
+            results = list(executor.map(
+                lambda u: (u, fetch_html_content(u, logger, stream=u.endswith(".txt"))),
+                SOURCES,
+            ))
+    finally:
+        SESSION.close()
+
+    for url, content in results:
+        if content:
             parser = get_parser_for_url(url)
-            raw = parser(html, logger)
-            all_raw.extend(raw)
+            raw = parser(content, logger)
             total_scraped += len(raw)
+            # Sources overlap heavily; drop duplicates here so each unique
+            # proxy is only validated once
+            for p in raw:
+                key = (p.get("ip address") or p.get("ip"), p.get("port"))
+                if key not in seen:
+                    seen.add(key)
+                    all_raw.append(p)
 
-    if args.type == "all":
-        valid_list = [v for p in all_raw if (v := validate_proxy(p))]
-    else:
-        valid_list = filter_proxies(all_raw, args.type, logger)
+    valid_set = filter_proxies(all_raw, args.type, logger)
 
-    save_proxies(valid_list, output_path, logger)
-    print_summary(total_scraped, len(valid_list), args.type, output_path, logger)
+    save_proxies(valid_set, output_path, logger, sort=args.sort)
+    print_summary(total_scraped, len(valid_set), args.type, output_path, logger)
 
 if __name__ == "__main__":
     main()